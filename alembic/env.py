@@ -1,15 +1,10 @@
 from logging.config import fileConfig
-import os
-from dotenv import load_dotenv
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
 
-# Load environment variables
-load_dotenv()
-
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -23,6 +18,19 @@ if config.config_file_name is not None:
 from app.models import Base
 target_metadata = Base.metadata
 
+# Same URL as the app (settings.database_url, psycopg driver, sslmode)
+from app.database import DATABASE_URL
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Skip indexes the models only create on other dialects (Index.ddl_if)"""
+    ddl_if = getattr(object, "_ddl_if", None)
+    if type_ == "index" and ddl_if is not None and ddl_if.dialect:
+        dialects = (ddl_if.dialect,) if isinstance(ddl_if.dialect, str) else ddl_if.dialect
+        return context.get_bind().dialect.name in dialects
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -41,15 +49,8 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    # Get database URL from environment
-    database_url = os.getenv("DATABASE_URL", "sqlite:///./field_insights.db")
-    
-    # Handle Render's PostgreSQL URL format
-    if database_url.startswith("postgres://"):
-        database_url = database_url.replace("postgres://", "postgresql://", 1)
-    
     context.configure(
-        url=database_url,
+        url=DATABASE_URL,
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
@@ -66,15 +67,8 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    # Get database URL from environment
-    database_url = os.getenv("DATABASE_URL", "sqlite:///./field_insights.db")
-    
-    # Handle Render's PostgreSQL URL format
-    if database_url.startswith("postgres://"):
-        database_url = database_url.replace("postgres://", "postgresql://", 1)
-    
-    # Override the sqlalchemy.url in the config
-    config.set_main_option("sqlalchemy.url", database_url)
+    # Override the sqlalchemy.url in the config ('%' escaped for configparser)
+    config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
     
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
@@ -84,7 +78,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
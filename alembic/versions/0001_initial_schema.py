@@ -0,0 +1,58 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sensor_readings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('field_id', sa.String(length=50), nullable=False),
+        sa.Column('sensor_type', sa.String(length=50), nullable=False),
+        sa.Column('reading_value', sa.Float(), nullable=False),
+        sa.Column('unit', sa.String(length=20), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sensor_readings_id', 'sensor_readings', ['id'])
+    op.create_index('idx_timestamp', 'sensor_readings', ['timestamp'])
+    op.create_index('idx_field_id', 'sensor_readings', ['field_id'])
+    op.create_index('idx_sensor_type', 'sensor_readings', ['sensor_type'])
+    op.create_index('idx_field_sensor', 'sensor_readings', ['field_id', 'sensor_type'])
+
+    op.create_table(
+        'daily_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('field_id', sa.String(length=50), nullable=False),
+        sa.Column('sensor_type', sa.String(length=50), nullable=False),
+        sa.Column('avg_value', sa.Float(), nullable=False),
+        sa.Column('min_value', sa.Float(), nullable=False),
+        sa.Column('max_value', sa.Float(), nullable=False),
+        sa.Column('count_readings', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_daily_stats_id', 'daily_stats', ['id'])
+    op.create_index('idx_daily_stats_date', 'daily_stats', ['date'])
+    op.create_index('idx_daily_stats_field', 'daily_stats', ['field_id'])
+    op.create_index('idx_daily_stats_sensor', 'daily_stats', ['sensor_type'])
+
+
+def downgrade() -> None:
+    op.drop_table('daily_stats')
+    op.drop_table('sensor_readings')
@@ -0,0 +1,52 @@
+"""Add analytics_summary materialized view
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Materialized views are PostgreSQL-only; SQLite computes analytics live
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW analytics_summary AS
+        SELECT
+            field_id,
+            sensor_type,
+            COUNT(*) AS count_readings,
+            SUM(reading_value) AS sum_value,
+            AVG(reading_value) AS avg_value
+        FROM sensor_readings
+        GROUP BY field_id, sensor_type
+        """
+    )
+    # Unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.create_index(
+        'idx_analytics_summary_field_sensor',
+        'analytics_summary',
+        ['field_id', 'sensor_type'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS analytics_summary")
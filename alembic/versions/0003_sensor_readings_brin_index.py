@@ -0,0 +1,40 @@
+"""Add BRIN index on sensor_readings.timestamp
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # BRIN is PostgreSQL-only; elsewhere this would be a duplicate of idx_timestamp
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # if_not_exists: databases created with create_all may already have it
+    op.create_index(
+        'idx_ts_brin',
+        'sensor_readings',
+        ['timestamp'],
+        postgresql_using='brin',
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('idx_ts_brin', table_name='sensor_readings', if_exists=True)
@@ -0,0 +1,42 @@
+"""Add unique index on daily_stats (date, field_id, sensor_type)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep only the newest row per key; duplicates would block the unique index
+    op.execute(
+        """
+        DELETE FROM daily_stats
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM daily_stats GROUP BY date, field_id, sensor_type
+        )
+        """
+    )
+    # Required by the INSERT ... ON CONFLICT upsert used at ingest time
+    op.create_index(
+        'idx_daily_stats_unique',
+        'daily_stats',
+        ['date', 'field_id', 'sensor_type'],
+        unique=True,
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_daily_stats_unique', table_name='daily_stats', if_exists=True)
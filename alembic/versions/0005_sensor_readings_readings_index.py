@@ -0,0 +1,39 @@
+"""Add descending (field_id, sensor_type, timestamp, id) index and drop redundant indexes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Serves filtered /readings ordered newest first, including keyset pagination
+    op.create_index(
+        'idx_field_sensor_ts_desc',
+        'sensor_readings',
+        ['field_id', 'sensor_type', sa.text('timestamp DESC'), sa.text('id DESC')],
+        if_not_exists=True
+    )
+    # Covered by the leading columns of idx_field_sensor_ts_desc
+    op.drop_index('idx_field_sensor', table_name='sensor_readings', if_exists=True)
+    op.drop_index('idx_field_id', table_name='sensor_readings', if_exists=True)
+    # Covered by a backward scan of idx_timestamp; may exist on databases built by create_all
+    op.drop_index('idx_ts_desc', table_name='sensor_readings', if_exists=True)
+
+
+def downgrade() -> None:
+    op.create_index('idx_field_id', 'sensor_readings', ['field_id'], if_not_exists=True)
+    op.create_index('idx_field_sensor', 'sensor_readings', ['field_id', 'sensor_type'], if_not_exists=True)
+    op.drop_index('idx_field_sensor_ts_desc', table_name='sensor_readings', if_exists=True)
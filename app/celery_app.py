@@ -1,12 +1,10 @@
 from celery import Celery
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from .config import settings
 
 # Celery configuration
-CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
-CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+CELERY_BROKER_URL = settings.celery_broker_url
+CELERY_RESULT_BACKEND = settings.celery_result_backend
 
 # Create Celery app
 celery_app = Celery(
@@ -18,9 +16,10 @@ celery_app = Celery(
 
 # Celery configuration
 celery_app.conf.update(
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
+    # msgpack keeps large sensor payloads compact; json is still accepted for in-flight messages
+    task_serializer='msgpack',
+    accept_content=['msgpack', 'json'],
+    result_serializer='msgpack',
     timezone='UTC',
     enable_utc=True,
     task_track_started=True,
@@ -30,6 +29,14 @@ celery_app.conf.update(
     worker_max_tasks_per_child=1000,
 )
 
+# Periodic tasks (run with `celery -A app.celery_app beat`)
+celery_app.conf.beat_schedule = {
+    'refresh-analytics-summary': {
+        'task': 'app.tasks.refresh_analytics_mv',
+        'schedule': 60.0,  # every minute
+    },
+}
+
 # Optional: Configure Celery to use the same log level as the main app
 celery_app.conf.update(
     worker_log_level='INFO',
@@ -0,0 +1,37 @@
+from typing import List, Optional
+from dotenv import load_dotenv
+
+try:
+    from pydantic import BaseSettings
+except ImportError:
+    # Pydantic v2 moved BaseSettings into the pydantic-settings package
+    from pydantic_settings import BaseSettings
+
+load_dotenv()
+
+class Settings(BaseSettings):
+    """Application settings, read once from environment variables / .env"""
+    
+    # Database
+    database_url: Optional[str] = None
+    db_pool_size: int = 20
+    db_max_overflow: int = 40
+    db_worker_pool_size: int = 2
+    db_worker_max_overflow: int = 2
+    
+    # Celery / Redis
+    celery_broker_url: str = "redis://localhost:6379/0"
+    celery_result_backend: str = "redis://localhost:6379/0"
+    
+    # App configuration
+    debug: bool = False
+    api_host: str = "0.0.0.0"
+    api_port: int = 8000
+    allowed_origins: str = "http://localhost:3000"
+    
+    @property
+    def allowed_origins_list(self) -> List[str]:
+        """Comma-separated ALLOWED_ORIGINS as a list"""
+        return [origin.strip() for origin in self.allowed_origins.split(",")]
+
+settings = Settings()
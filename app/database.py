@@ -1,21 +1,20 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
 import urllib.parse
 
-load_dotenv()
+from .config import settings
 
 def get_database_url():
     """Get database URL with proper handling for Render PostgreSQL"""
-    database_url = os.getenv("DATABASE_URL")
+    database_url = settings.database_url
     
     if database_url:
-        # Handle Render's PostgreSQL URL format
+        # Handle Render's PostgreSQL URL format and select the psycopg (v3) driver
         if database_url.startswith("postgres://"):
-            # Convert postgres:// to postgresql:// for psycopg2
-            database_url = database_url.replace("postgres://", "postgresql://", 1)
+            database_url = database_url.replace("postgres://", "postgresql+psycopg://", 1)
+        elif database_url.startswith("postgresql://"):
+            database_url = database_url.replace("postgresql://", "postgresql+psycopg://", 1)
         
         # Add SSL parameters to URL if not present
         if "sslmode" not in database_url:
@@ -32,24 +31,45 @@ def get_database_url():
 # Database URL from environment variable
 DATABASE_URL = get_database_url()
 
-# Create SQLAlchemy engine with appropriate configuration
-if DATABASE_URL.startswith("postgresql"):
-    # PostgreSQL configuration
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=300,
-        echo=os.getenv("DEBUG", "False").lower() == "true"
-    )
-else:
+def build_engine(pool_size: int, max_overflow: int):
+    """Create SQLAlchemy engine with appropriate configuration"""
+    if DATABASE_URL.startswith("postgresql"):
+        # PostgreSQL configuration
+        return create_engine(
+            DATABASE_URL,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=30,
+            pool_pre_ping=True,
+            pool_recycle=300,
+            # Batch executemany INSERTs into multi-row VALUES statements
+            insertmanyvalues_page_size=1000,
+            echo=settings.debug
+        )
+    
     # SQLite configuration
-    engine = create_engine(
+    return create_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
     )
 
+# Engine for the API: sized for concurrent requests across Uvicorn workers
+engine = build_engine(
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow
+)
+
+# Engine for Celery tasks: each task holds a single connection
+worker_engine = build_engine(
+    pool_size=settings.db_worker_pool_size,
+    max_overflow=settings.db_worker_max_overflow
+)
+
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Create WorkerSessionLocal class for background tasks
+WorkerSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=worker_engine)
 
 # Create Base class for models
 Base = declarative_base()
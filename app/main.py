@@ -1,12 +1,14 @@
 from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import func, select, text, tuple_
 from sqlalchemy.orm import Session
-from typing import List
-import os
-from dotenv import load_dotenv
+from typing import List, Optional
+import orjson
 from datetime import datetime
 
-from .database import get_db, create_tables
+from .config import settings
+from .database import DATABASE_URL, engine, get_db, create_tables
 from .models import SensorReading, DailyStats
 from .schemas import (
     SensorReadingCreate, 
@@ -15,31 +17,33 @@ from .schemas import (
     HealthResponse,
     TaskResponse
 )
-from .services import SensorService, AnalyticsService, HealthService
+from .services import SensorService, AnalyticsService, HealthService, CacheService
 from .celery_app import celery_app
-
-load_dotenv()
+from .tasks import refresh_analytics_summary
 
 # Create FastAPI app
 app = FastAPI(
     title="Field Insights Dashboard API",
     description="API for IoT sensor data management and analytics",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(","),
+    allow_origins=settings.allowed_origins_list,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Create database tables on startup
+# Create database tables on startup for local SQLite development only;
+# PostgreSQL schemas are managed by Alembic (`alembic upgrade head`)
 @app.on_event("startup")
 async def startup_event():
-    create_tables()
+    if DATABASE_URL.startswith("sqlite"):
+        create_tables()
 
 @app.get("/", tags=["Root"])
 async def root():
@@ -127,7 +131,7 @@ async def get_sensor_type_analytics(sensor_type: str, db: Session = Depends(get_
         raise HTTPException(status_code=500, detail=f"Error fetching sensor analytics: {str(e)}")
 
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
-async def health_check(db: Session = Depends(get_db)):
+async def health_check():
     """
     Health check endpoint to verify system status.
     
@@ -137,7 +141,7 @@ async def health_check(db: Session = Depends(get_db)):
     - Overall system status
     """
     try:
-        db_connected = HealthService.check_database_connection(db)
+        db_connected = HealthService.check_database_connection()
         redis_connected = HealthService.check_redis_connection()
         
         status = "healthy" if db_connected and redis_connected else "unhealthy"
@@ -166,17 +170,21 @@ async def get_task_status(task_id: str):
     try:
         task = celery_app.AsyncResult(task_id)
         
-        if task.state == 'PENDING':
+        # Large batches: count finished chunks while the chord callback is pending
+        chunks = celery_app.GroupResult.restore(task_id) if task.state == 'PENDING' else None
+        completed_chunks = chunks.completed_count() if chunks is not None else 0
+        
+        if completed_chunks:
             response = {
                 'task_id': task_id,
-                'status': 'PENDING',
-                'message': 'Task is pending'
+                'status': 'PROGRESS',
+                'message': f'Task is in progress: {completed_chunks}/{len(chunks.results)} chunks'
             }
-        elif task.state == 'PROGRESS':
+        elif task.state == 'PENDING':
             response = {
                 'task_id': task_id,
-                'status': 'PROGRESS',
-                'message': f'Task is in progress: {task.info.get("current", 0)}/{task.info.get("total", 0)}'
+                'status': 'PENDING',
+                'message': 'Task is pending'
             }
         elif task.state == 'SUCCESS':
             response = {
@@ -202,7 +210,8 @@ async def get_readings(
     offset: int = 0,
     field_id: str = None,
     sensor_type: str = None,
-    db: Session = Depends(get_db)
+    before_timestamp: Optional[datetime] = None,
+    before_id: Optional[int] = None
 ):
     """
     Get sensor readings with optional filtering.
@@ -212,22 +221,57 @@ async def get_readings(
     - offset: Number of readings to skip (default: 0)
     - field_id: Filter by field ID
     - sensor_type: Filter by sensor type
+    - before_timestamp / before_id: Keyset pagination; return readings older than
+      the last reading of the previous page (prefer over offset for deep pages)
     """
+    if before_id is not None and before_timestamp is None:
+        raise HTTPException(status_code=422, detail="before_id requires before_timestamp")
+    
     try:
-        query = db.query(SensorReading)
+        # Core select of plain columns (in response schema order), bypassing the ORM
+        readings = SensorReading.__table__
+        stmt = select(
+            readings.c.timestamp,
+            readings.c.field_id,
+            readings.c.sensor_type,
+            readings.c.reading_value,
+            readings.c.unit,
+            readings.c.id
+        )
         
         if field_id:
-            query = query.filter(SensorReading.field_id == field_id)
+            stmt = stmt.where(readings.c.field_id == field_id)
         
         if sensor_type:
-            query = query.filter(SensorReading.sensor_type == sensor_type)
+            stmt = stmt.where(readings.c.sensor_type == sensor_type)
+        
+        if before_timestamp is not None:
+            if before_id is not None:
+                stmt = stmt.where(
+                    tuple_(readings.c.timestamp, readings.c.id) < tuple_(before_timestamp, before_id)
+                )
+            else:
+                stmt = stmt.where(readings.c.timestamp < before_timestamp)
+        
+        stmt = (
+            stmt.order_by(readings.c.timestamp.desc(), readings.c.id.desc())
+            .offset(offset)
+            .limit(limit)
+            .execution_options(yield_per=500)
+        )
         
-        readings = query.order_by(SensorReading.timestamp.desc()).offset(offset).limit(limit).all()
-        # Convert SQLAlchemy objects to Pydantic models
-        readings_schema = []
-        for reading in readings:
-            readings_schema.append(SensorReadingSchema.from_orm(reading))
-        return readings_schema
+        def generate():
+            # The stream owns its connection (a dependency's would be closed before
+            # or while the response is sent); rows are fetched from the cursor in batches
+            with engine.connect() as connection:
+                yield b"["
+                for i, row in enumerate(connection.execute(stmt)):
+                    if i:
+                        yield b","
+                    yield orjson.dumps(row._asdict())
+                yield b"]"
+        
+        return StreamingResponse(generate(), media_type="application/json")
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching readings: {str(e)}")
@@ -245,15 +289,29 @@ async def clear_all_data(db: Session = Depends(get_db)):
     - Number of daily stats deleted
     """
     try:
-        # Delete all sensor readings
-        sensor_readings_deleted = db.query(SensorReading).delete()
+        # Count rows up front so the response keeps reporting what was removed
+        sensor_readings_deleted = db.query(func.count(SensorReading.id)).scalar()
+        daily_stats_deleted = db.query(func.count(DailyStats.id)).scalar()
+        
+        if db.bind.dialect.name == 'postgresql':
+            # TRUNCATE drops the table data without per-row WAL entries
+            db.execute(text(
+                f"TRUNCATE TABLE {SensorReading.__tablename__}, {DailyStats.__tablename__} RESTART IDENTITY"
+            ))
+        else:
+            # SQLite has no TRUNCATE
+            db.query(SensorReading).delete()
+            db.query(DailyStats).delete()
         
-        # Delete all daily stats
-        daily_stats_deleted = db.query(DailyStats).delete()
+        # Refresh the analytics summary so it no longer reflects deleted rows
+        refresh_analytics_summary(db)
         
         # Commit the changes
         db.commit()
         
+        # Drop cached analytics for the cleared data
+        CacheService.invalidate_analytics()
+        
         return {
             "message": "All data cleared successfully",
             "sensor_readings_deleted": sensor_readings_deleted,
@@ -269,7 +327,7 @@ if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
         "app.main:app",
-        host=os.getenv("API_HOST", "0.0.0.0"),
-        port=int(os.getenv("API_PORT", 8000)),
-        reload=os.getenv("DEBUG", "True").lower() == "true"
+        host=settings.api_host,
+        port=settings.api_port,
+        reload=settings.debug
     ) 
\ No newline at end of file
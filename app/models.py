@@ -16,9 +16,13 @@ class SensorReading(Base):
     # Create indexes for better query performance
     __table_args__ = (
         Index('idx_timestamp', 'timestamp'),
-        Index('idx_field_id', 'field_id'),
+        # Compact block-range index for timestamp range scans (PostgreSQL only;
+        # elsewhere it would just duplicate idx_timestamp)
+        Index('idx_ts_brin', 'timestamp', postgresql_using='brin').ddl_if(dialect='postgresql'),
         Index('idx_sensor_type', 'sensor_type'),
-        Index('idx_field_sensor', 'field_id', 'sensor_type'),
+        # Covers field_id / (field_id, sensor_type) lookups and filtered /readings
+        # queries ordered newest first (incl. keyset pagination)
+        Index('idx_field_sensor_ts_desc', 'field_id', 'sensor_type', timestamp.desc(), id.desc()),
     )
 
 class DailyStats(Base):
@@ -38,4 +42,5 @@ class DailyStats(Base):
         Index('idx_daily_stats_date', 'date'),
         Index('idx_daily_stats_field', 'field_id'),
         Index('idx_daily_stats_sensor', 'sensor_type'),
+        Index('idx_daily_stats_unique', 'date', 'field_id', 'sensor_type', unique=True),
     ) 
\ No newline at end of file
@@ -1,12 +1,99 @@
+from celery import chord
+import redis
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Dict, Optional
+from sqlalchemy import func, insert, text
+from sqlalchemy.exc import ProgrammingError
+from typing import Any, Callable, List, Dict, Optional
 from datetime import datetime, timedelta
-import os
+import json
+import logging
 
+from .celery_app import celery_app
+from .config import settings
+from .database import engine
 from .models import SensorReading, DailyStats
 from .schemas import SensorReadingCreate, AnalyticsResponse, SensorReading as SensorReadingSchema
-from .tasks import process_sensor_data_batch
+from .tasks import (
+    ANALYTICS_SUMMARY_VIEW,
+    TASK_CHUNK_SIZE,
+    process_chunk,
+    finalize_sensor_data_batch,
+    refresh_analytics_mv,
+    upsert_daily_stats
+)
+
+logger = logging.getLogger(__name__)
+
+# Shared Redis client (Celery broker); connections are pooled and opened lazily
+_redis = redis.Redis.from_url(
+    celery_app.conf.broker_url,
+    socket_connect_timeout=1,
+    socket_timeout=1
+)
+
+class CacheService:
+    """Service class for caching analytics responses in Redis"""
+    
+    ANALYTICS_TTL = 60  # seconds
+    ANALYTICS_KEY_PREFIX = "analytics:v1:"
+    # Bumped on every data change; cached responses live under the current generation
+    ANALYTICS_GENERATION_KEY = "analytics:v1:generation"
+    
+    # Held while a debounced analytics_summary refresh is queued
+    SUMMARY_REFRESH_LOCK_KEY = "analytics_summary:refresh-queued"
+    SUMMARY_REFRESH_DELAY = 30  # seconds
+    
+    @classmethod
+    def analytics_key(cls, name: str) -> str:
+        """Cache key for an analytics response in the current cache generation"""
+        try:
+            generation = int(_redis.get(cls.ANALYTICS_GENERATION_KEY) or 0)
+        except Exception as e:
+            logger.warning(f"Error reading analytics cache generation: {str(e)}")
+            generation = 0
+        return f"{cls.ANALYTICS_KEY_PREFIX}{generation}:{name}"
+    
+    @classmethod
+    def get_or_set(cls, key: str, ttl: int, producer: Callable[[], Any]) -> Any:
+        """Return the cached value for key, or compute it with producer and cache it"""
+        try:
+            cached = _redis.get(key)
+            if cached is not None:
+                return json.loads(cached)
+        except Exception as e:
+            logger.warning(f"Error reading cache key {key}: {str(e)}")
+        
+        value = producer()
+        
+        try:
+            _redis.set(key, json.dumps(value, default=str), ex=ttl)
+        except Exception as e:
+            logger.warning(f"Error writing cache key {key}: {str(e)}")
+        
+        return value
+    
+    @classmethod
+    def invalidate_analytics(cls) -> None:
+        """Drop all cached analytics responses (older generations expire via their TTL)"""
+        try:
+            _redis.incr(cls.ANALYTICS_GENERATION_KEY)
+        except Exception as e:
+            logger.warning(f"Error invalidating analytics cache: {str(e)}")
+    
+    @classmethod
+    def readings_changed(cls) -> None:
+        """
+        Drop cached analytics and queue a refresh of the analytics_summary view.
+        At most one refresh is queued per SUMMARY_REFRESH_DELAY; it runs at the end
+        of that window so it covers every write made during it. Celery beat's
+        periodic refresh is the fallback if queueing fails.
+        """
+        cls.invalidate_analytics()
+        try:
+            if _redis.set(cls.SUMMARY_REFRESH_LOCK_KEY, 1, nx=True, ex=cls.SUMMARY_REFRESH_DELAY):
+                refresh_analytics_mv.apply_async(countdown=cls.SUMMARY_REFRESH_DELAY)
+        except Exception as e:
+            logger.warning(f"Error queueing analytics summary refresh: {str(e)}")
 
 class SensorService:
     """Service class for sensor data operations"""
@@ -23,28 +110,44 @@ class SensorService:
     @staticmethod
     def create_sensor_readings_batch(db: Session, readings: List[SensorReadingCreate]) -> List[SensorReading]:
         """Create multiple sensor readings in a batch"""
-        db_readings = []
-        for reading in readings:
-            db_reading = SensorReading(**reading.dict())
-            db.add(db_reading)
-            db_readings.append(db_reading)
+        if not readings:
+            return []
         
+        # Single multi-row INSERT ... RETURNING instead of per-row add/refresh
+        readings_data = [reading.dict() for reading in readings]
+        table = SensorReading.__table__
+        stmt = insert(table).values(readings_data).returning(*table.c)
+        rows = db.execute(stmt).all()
+        upsert_daily_stats(db, readings_data)
         db.commit()
-        for reading in db_readings:
-            db.refresh(reading)
+        CacheService.readings_changed()
         
-        return db_readings
+        return [SensorReading(**row._mapping) for row in rows]
     
     @staticmethod
     def process_large_batch(readings: List[SensorReadingCreate]) -> str:
         """Process large batch of readings using Celery background task"""
-        # Convert to dict for Celery serialization
-        readings_data = [reading.dict() for reading in readings]
+        # Convert to dict for Celery serialization (msgpack has no datetime type)
+        readings_data = []
+        for reading in readings:
+            reading_data = reading.dict()
+            reading_data['timestamp'] = reading.timestamp.isoformat()
+            readings_data.append(reading_data)
+        
+        # Insert chunks in parallel across workers, then aggregate in a single callback
+        header = [
+            process_chunk.s(readings_data[start:start + TASK_CHUNK_SIZE])
+            for start in range(0, len(readings_data), TASK_CHUNK_SIZE)
+        ]
+        result = chord(header)(finalize_sensor_data_batch.s())
         
-        # Start background task
-        task = process_sensor_data_batch.delay(readings_data)
+        # The callback stays PENDING until every chunk is done; store the header's
+        # GroupResult under the callback id so /task/{task_id} can report progress
+        # (no header result when tasks run eagerly: the chord has already finished)
+        if result.parent is not None:
+            celery_app.backend.save_group(result.id, result.parent)
         
-        return task.id
+        return result.id
     
     @staticmethod
     def get_recent_readings(db: Session, limit: int = 10) -> List[SensorReading]:
@@ -58,30 +161,40 @@ class AnalyticsService:
     
     @staticmethod
     def get_analytics(db: Session) -> AnalyticsResponse:
-        """Get comprehensive analytics data"""
-        
-        # Get total readings count
-        total_readings = db.query(SensorReading).count()
-        
-        # Get unique fields and sensor types
-        fields = [r[0] for r in db.query(SensorReading.field_id).distinct()]
-        sensor_types = [r[0] for r in db.query(SensorReading.sensor_type).distinct()]
-        
-        # Calculate averages by field
-        avg_by_field = {}
-        for field in fields:
-            result = db.query(func.avg(SensorReading.reading_value)).filter(
-                SensorReading.field_id == field
-            ).scalar()
-            avg_by_field[field] = float(result) if result else 0.0
-        
-        # Calculate averages by sensor type
-        avg_by_sensor_type = {}
-        for sensor_type in sensor_types:
-            result = db.query(func.avg(SensorReading.reading_value)).filter(
-                SensorReading.sensor_type == sensor_type
-            ).scalar()
-            avg_by_sensor_type[sensor_type] = float(result) if result else 0.0
+        """Get comprehensive analytics data (cached)"""
+        data = CacheService.get_or_set(
+            CacheService.analytics_key("all"),
+            CacheService.ANALYTICS_TTL,
+            lambda: AnalyticsService._compute_analytics(db).dict()
+        )
+        return AnalyticsResponse(**data)
+    
+    @staticmethod
+    def _compute_analytics(db: Session) -> AnalyticsResponse:
+        """Compute comprehensive analytics data from the database"""
+        
+        total_readings = 0
+        counts_by_field, sums_by_field = {}, {}
+        counts_by_sensor_type, sums_by_sensor_type = {}, {}
+        
+        # Roll per-(field, sensor type) counts and sums up to fields and sensor types
+        for field_id, sensor_type, count, total in AnalyticsService._get_summary_rows(db):
+            total_readings += count
+            counts_by_field[field_id] = counts_by_field.get(field_id, 0) + count
+            sums_by_field[field_id] = sums_by_field.get(field_id, 0.0) + (total or 0.0)
+            counts_by_sensor_type[sensor_type] = counts_by_sensor_type.get(sensor_type, 0) + count
+            sums_by_sensor_type[sensor_type] = sums_by_sensor_type.get(sensor_type, 0.0) + (total or 0.0)
+        
+        fields = list(counts_by_field)
+        sensor_types = list(counts_by_sensor_type)
+        avg_by_field = {
+            field: float(sums_by_field[field]) / count if count else 0.0
+            for field, count in counts_by_field.items()
+        }
+        avg_by_sensor_type = {
+            sensor_type: float(sums_by_sensor_type[sensor_type]) / count if count else 0.0
+            for sensor_type, count in counts_by_sensor_type.items()
+        }
         
         # Get recent readings
         recent_readings = SensorService.get_recent_readings(db, 5)
@@ -106,57 +219,114 @@ class AnalyticsService:
             recent_readings=recent_readings_schema if recent_readings_schema else None
         )
     
+    @staticmethod
+    def _get_summary_rows(db: Session) -> List:
+        """
+        Get (field_id, sensor_type, count, sum) rows.
+        Reads the analytics_summary materialized view on PostgreSQL and falls back
+        to a live GROUP BY when the view is unavailable (SQLite or not migrated yet).
+        The view is refreshed off the request path (see CacheService.readings_changed).
+        """
+        if db.bind.dialect.name == 'postgresql':
+            try:
+                # Savepoint so a missing view does not abort the session's transaction
+                with db.begin_nested():
+                    return db.execute(text(
+                        f"SELECT field_id, sensor_type, count_readings, sum_value FROM {ANALYTICS_SUMMARY_VIEW}"
+                    )).all()
+            except ProgrammingError as e:
+                logger.warning(f"Error reading {ANALYTICS_SUMMARY_VIEW}, computing analytics live: {str(e)}")
+        
+        return db.query(
+            SensorReading.field_id,
+            SensorReading.sensor_type,
+            func.count(SensorReading.id),
+            func.sum(SensorReading.reading_value)
+        ).group_by(SensorReading.field_id, SensorReading.sensor_type).all()
+    
     @staticmethod
     def get_field_analytics(db: Session, field_id: str) -> Dict:
-        """Get analytics for a specific field"""
-        readings = db.query(SensorReading).filter(
+        """Get analytics for a specific field (cached)"""
+        return CacheService.get_or_set(
+            CacheService.analytics_key(f"field:{field_id}"),
+            CacheService.ANALYTICS_TTL,
+            lambda: AnalyticsService._compute_field_analytics(db, field_id)
+        )
+    
+    @staticmethod
+    def _compute_field_analytics(db: Session, field_id: str) -> Dict:
+        """Compute analytics for a specific field from the database"""
+        total_readings, avg_value, min_value, max_value = db.query(
+            func.count(SensorReading.id),
+            func.avg(SensorReading.reading_value),
+            func.min(SensorReading.reading_value),
+            func.max(SensorReading.reading_value)
+        ).filter(
             SensorReading.field_id == field_id
-        ).all()
+        ).one()
         
-        if not readings:
+        if not total_readings:
             return {}
         
-        values = [r.reading_value for r in readings]
+        sensor_types = [r[0] for r in db.query(SensorReading.sensor_type).filter(
+            SensorReading.field_id == field_id
+        ).distinct()]
         
         return {
             'field_id': field_id,
-            'total_readings': len(readings),
-            'avg_value': sum(values) / len(values),
-            'min_value': min(values),
-            'max_value': max(values),
-            'sensor_types': list(set(r.sensor_type for r in readings))
+            'total_readings': total_readings,
+            'avg_value': float(avg_value),
+            'min_value': min_value,
+            'max_value': max_value,
+            'sensor_types': sensor_types
         }
     
     @staticmethod
     def get_sensor_type_analytics(db: Session, sensor_type: str) -> Dict:
-        """Get analytics for a specific sensor type"""
-        readings = db.query(SensorReading).filter(
+        """Get analytics for a specific sensor type (cached)"""
+        return CacheService.get_or_set(
+            CacheService.analytics_key(f"sensor:{sensor_type}"),
+            CacheService.ANALYTICS_TTL,
+            lambda: AnalyticsService._compute_sensor_type_analytics(db, sensor_type)
+        )
+    
+    @staticmethod
+    def _compute_sensor_type_analytics(db: Session, sensor_type: str) -> Dict:
+        """Compute analytics for a specific sensor type from the database"""
+        total_readings, avg_value, min_value, max_value = db.query(
+            func.count(SensorReading.id),
+            func.avg(SensorReading.reading_value),
+            func.min(SensorReading.reading_value),
+            func.max(SensorReading.reading_value)
+        ).filter(
             SensorReading.sensor_type == sensor_type
-        ).all()
+        ).one()
         
-        if not readings:
+        if not total_readings:
             return {}
         
-        values = [r.reading_value for r in readings]
+        fields = [r[0] for r in db.query(SensorReading.field_id).filter(
+            SensorReading.sensor_type == sensor_type
+        ).distinct()]
         
         return {
             'sensor_type': sensor_type,
-            'total_readings': len(readings),
-            'avg_value': sum(values) / len(values),
-            'min_value': min(values),
-            'max_value': max(values),
-            'fields': list(set(r.field_id for r in readings))
+            'total_readings': total_readings,
+            'avg_value': float(avg_value),
+            'min_value': min_value,
+            'max_value': max_value,
+            'fields': fields
         }
 
 class HealthService:
     """Service class for health checks"""
     
     @staticmethod
-    def check_database_connection(db: Session) -> bool:
+    def check_database_connection() -> bool:
         """Check if database connection is working"""
         try:
-            from sqlalchemy import text
-            db.execute(text("SELECT 1"))
+            with engine.connect() as connection:
+                connection.exec_driver_sql("SELECT 1")
             return True
         except Exception:
             return False
@@ -165,39 +335,10 @@ class HealthService:
     def check_redis_connection() -> bool:
         """Check if Redis connection is working"""
         # For local development, always return True if DEBUG is set
-        if os.getenv("DEBUG", "False").lower() == "true":
+        if settings.debug:
             return True
             
         try:
-            import redis
-            from .celery_app import celery_app
-            
-            # Get Redis URL from Celery config
-            redis_url = celery_app.conf.broker_url
-            if redis_url.startswith('redis://'):
-                # Parse Redis URL
-                redis_url = redis_url.replace('redis://', '')
-                if '@' in redis_url:
-                    # Handle password
-                    auth, rest = redis_url.split('@', 1)
-                    password = auth.split(':', 1)[1] if ':' in auth else None
-                    host_port = rest.split('/', 1)[0]
-                    host, port = host_port.split(':')
-                    port = int(port)
-                else:
-                    # No password
-                    host_port = redis_url.split('/', 1)[0]
-                    host, port = host_port.split(':')
-                    port = int(port)
-                    password = None
-                
-                # Test connection
-                r = redis.Redis(host=host, port=port, password=password, socket_connect_timeout=5)
-                r.ping()
-                return True
-            else:
-                # Fallback to Celery inspect
-                celery_app.control.inspect().active()
-                return True
+            return _redis.ping()
         except Exception:
-            return False 
\ No newline at end of file
+            return False
@@ -1,65 +1,278 @@
 from celery import current_task
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from sqlalchemy import case, func, insert, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError, ProgrammingError
+from datetime import datetime, time, timedelta, timezone
+import csv
+import io
 import logging
 from typing import List, Dict
 
 from .celery_app import celery_app
-from .database import SessionLocal
+from .database import WorkerSessionLocal
 from .models import SensorReading, DailyStats
 from .schemas import SensorReadingCreate
 
 logger = logging.getLogger(__name__)
 
+# Number of rows handled (and sent in one COPY / executemany) by each process_chunk subtask
+TASK_CHUNK_SIZE = 5000
+
+# Retries for a process_chunk transaction aborted by a PostgreSQL deadlock
+DEADLOCK_MAX_RETRIES = 3
+
+# PostgreSQL materialized view with per-(field_id, sensor_type) counts and sums
+ANALYTICS_SUMMARY_VIEW = 'analytics_summary'
+
+READING_COLUMNS = ('timestamp', 'field_id', 'sensor_type', 'reading_value', 'unit')
+
+def _parse_timestamps(readings_data: List[Dict]) -> List[Dict]:
+    """Convert ISO timestamp strings (msgpack has no datetime type) to datetimes in place"""
+    parse = datetime.fromisoformat
+    for reading_data in readings_data:
+        timestamp = reading_data['timestamp']
+        if isinstance(timestamp, str):
+            reading_data['timestamp'] = parse(timestamp)
+    return readings_data
+
+def _utc_day_start(timestamp: datetime) -> datetime:
+    """Get the UTC midnight of the day a timestamp falls on (naive timestamps are taken as UTC)"""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return datetime.combine(timestamp.astimezone(timezone.utc).date(), time.min, tzinfo=timezone.utc)
+
+def _is_deadlock(error: DBAPIError) -> bool:
+    """Check whether a database error is a PostgreSQL deadlock (SQLSTATE 40P01)"""
+    orig = error.orig
+    return (getattr(orig, 'sqlstate', None) or getattr(orig, 'pgcode', None)) == '40P01'
+
+def _readings_to_csv(readings_data: List[Dict]) -> io.StringIO:
+    """Serialize readings into a CSV buffer suitable for COPY FROM STDIN"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for reading_data in readings_data:
+        writer.writerow([reading_data[column] for column in READING_COLUMNS])
+    buffer.seek(0)
+    return buffer
+
+def bulk_insert_readings(db: Session, readings_data: List[Dict]) -> int:
+    """
+    Insert a chunk of readings without going through the ORM unit of work.
+    Uses COPY on PostgreSQL and a single executemany INSERT elsewhere.
+    Timestamps must already be datetimes (see _parse_timestamps).
+    """
+    if not readings_data:
+        return 0
+    
+    if db.bind.dialect.name == 'postgresql':
+        copy_sql = (
+            f"COPY {SensorReading.__tablename__} ({', '.join(READING_COLUMNS)}) "
+            "FROM STDIN WITH CSV"
+        )
+        buffer = _readings_to_csv(readings_data)
+        cursor = db.connection().connection.cursor()
+        try:
+            if hasattr(cursor, 'copy'):
+                # psycopg (v3)
+                with cursor.copy(copy_sql) as copy:
+                    copy.write(buffer.getvalue())
+            elif hasattr(cursor, 'copy_expert'):
+                # psycopg2
+                cursor.copy_expert(copy_sql, buffer)
+            else:
+                # pg8000
+                cursor.execute(copy_sql, stream=buffer)
+        finally:
+            cursor.close()
+    else:
+        db.execute(
+            insert(SensorReading.__table__),
+            [{column: reading_data[column] for column in READING_COLUMNS} for reading_data in readings_data]
+        )
+    
+    return len(readings_data)
+
+def upsert_daily_stats(db: Session, readings_data: List[Dict]) -> int:
+    """
+    Fold a chunk of readings into daily_stats incrementally.
+    Partial aggregates per (day, field_id, sensor_type) are merged into existing
+    rows with INSERT ... ON CONFLICT DO UPDATE.
+    """
+    partials = {}
+    for reading_data in readings_data:
+        key = (
+            _utc_day_start(reading_data['timestamp']),
+            reading_data['field_id'],
+            reading_data['sensor_type']
+        )
+        value = reading_data['reading_value']
+        partial = partials.get(key)
+        if partial is None:
+            partials[key] = [1, value, value, value]
+        else:
+            partial[0] += 1
+            partial[1] += value
+            partial[2] = min(partial[2], value)
+            partial[3] = max(partial[3], value)
+    
+    if not partials:
+        return 0
+    
+    rows = [
+        {
+            'date': date,
+            'field_id': field_id,
+            'sensor_type': sensor_type,
+            'avg_value': total / count,
+            'min_value': min_value,
+            'max_value': max_value,
+            'count_readings': count
+        }
+        # Sorted so concurrent chunks lock daily_stats rows in the same order (avoids deadlocks)
+        for (date, field_id, sensor_type), (count, total, min_value, max_value) in sorted(partials.items())
+    ]
+    
+    dialect_insert = postgresql.insert if db.bind.dialect.name == 'postgresql' else sqlite.insert
+    table = DailyStats.__table__
+    stmt = dialect_insert(table).values(rows)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.date, table.c.field_id, table.c.sensor_type],
+        set_={
+            'count_readings': table.c.count_readings + excluded.count_readings,
+            'avg_value': (
+                table.c.avg_value * table.c.count_readings + excluded.avg_value * excluded.count_readings
+            ) / (table.c.count_readings + excluded.count_readings),
+            'min_value': case(
+                (excluded.min_value < table.c.min_value, excluded.min_value),
+                else_=table.c.min_value
+            ),
+            'max_value': case(
+                (excluded.max_value > table.c.max_value, excluded.max_value),
+                else_=table.c.max_value
+            )
+        }
+    )
+    db.execute(stmt)
+    
+    return len(rows)
+
+def refresh_analytics_summary(db: Session) -> bool:
+    """
+    Refresh the analytics_summary materialized view (PostgreSQL only).
+    Returns False when the backend has no materialized view to refresh
+    (SQLite, or PostgreSQL before migration 0002 is applied).
+    """
+    if db.bind.dialect.name != 'postgresql':
+        return False
+    
+    try:
+        # Savepoint so a missing view does not abort the caller's transaction
+        with db.begin_nested():
+            db.execute(text(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {ANALYTICS_SUMMARY_VIEW}'))
+    except ProgrammingError as e:
+        # View not created yet (migration 0002 not applied); analytics are computed live
+        logger.warning(f"Could not refresh {ANALYTICS_SUMMARY_VIEW}: {str(e)}")
+        return False
+    
+    return True
+
 @celery_app.task(bind=True)
-def process_sensor_data_batch(self, readings_data: List[Dict]):
+def process_chunk(self, readings_data: List[Dict]):
     """
-    Background task to process a batch of sensor readings
+    Background task to insert one slice of a large batch of sensor readings
     """
     try:
-        self.update_state(state='PROGRESS', meta={'current': 0, 'total': len(readings_data)})
-        
-        db = SessionLocal()
-        processed_count = 0
+        # Timestamps arrive as ISO strings; the inserts and daily_stats bucketing need datetimes
+        readings_data = _parse_timestamps(readings_data)
+        db = WorkerSessionLocal()
         
         try:
-            for i, reading_data in enumerate(readings_data):
-                # Create sensor reading
-                reading = SensorReading(
-                    timestamp=reading_data['timestamp'],
-                    field_id=reading_data['field_id'],
-                    sensor_type=reading_data['sensor_type'],
-                    reading_value=reading_data['reading_value'],
-                    unit=reading_data['unit']
-                )
-                
-                db.add(reading)
-                processed_count += 1
-                
-                # Update progress every 10 items
-                if i % 10 == 0:
-                    self.update_state(
-                        state='PROGRESS',
-                        meta={'current': i, 'total': len(readings_data)}
-                    )
+            processed_count = bulk_insert_readings(db, readings_data)
+            upsert_daily_stats(db, readings_data)
+            db.commit()
+            
+            return {
+                'status': 'SUCCESS',
+                'processed_count': processed_count
+            }
             
+        finally:
+            db.close()
+            
+    except DBAPIError as e:
+        # The whole chunk was rolled back; retry it rather than losing the readings
+        if _is_deadlock(e) and self.request.retries < DEADLOCK_MAX_RETRIES:
+            logger.warning(f"Deadlock processing sensor data chunk, retrying: {str(e)}")
+            raise self.retry(exc=e, countdown=self.request.retries + 1)
+        
+        logger.error(f"Error processing sensor data chunk: {str(e)}")
+        return {
+            'status': 'FAILURE',
+            'processed_count': 0,
+            'error': str(e)
+        }
+    except Exception as e:
+        logger.error(f"Error processing sensor data chunk: {str(e)}")
+        return {
+            'status': 'FAILURE',
+            'processed_count': 0,
+            'error': str(e)
+        }
+
+@celery_app.task
+def finalize_sensor_data_batch(chunk_results: List[Dict]):
+    """
+    Chord callback that aggregates process_chunk results for a large batch
+    """
+    processed_count = sum(result.get('processed_count', 0) for result in chunk_results)
+    errors = [result['error'] for result in chunk_results if result.get('status') == 'FAILURE']
+    
+    # Cached analytics and the analytics_summary view are stale once new readings land
+    from .services import CacheService
+    CacheService.readings_changed()
+    
+    if errors:
+        return {
+            'status': 'FAILURE',
+            'processed_count': processed_count,
+            'error': f'{len(errors)} of {len(chunk_results)} chunks failed: {errors[0]}'
+        }
+    
+    return {
+        'status': 'SUCCESS',
+        'processed_count': processed_count,
+        'message': f'Successfully processed {processed_count} sensor readings'
+    }
+
+@celery_app.task
+def refresh_analytics_mv():
+    """
+    Periodic task (Celery beat) to refresh the analytics_summary materialized view
+    """
+    try:
+        db = WorkerSessionLocal()
+        
+        try:
+            refreshed = refresh_analytics_summary(db)
             db.commit()
             
-            # Trigger analytics calculation
-            calculate_daily_stats.delay()
+            if refreshed:
+                # Cached analytics were computed from the previous snapshot
+                from .services import CacheService
+                CacheService.invalidate_analytics()
             
             return {
                 'status': 'SUCCESS',
-                'processed_count': processed_count,
-                'message': f'Successfully processed {processed_count} sensor readings'
+                'message': 'Analytics summary refreshed' if refreshed else 'No analytics summary to refresh'
             }
             
         finally:
             db.close()
             
     except Exception as e:
-        logger.error(f"Error processing sensor data batch: {str(e)}")
+        logger.error(f"Error refreshing analytics summary: {str(e)}")
         return {
             'status': 'FAILURE',
             'error': str(e)
@@ -68,14 +281,20 @@ def process_sensor_data_batch(self, readings_data: List[Dict]):
 @celery_app.task
 def calculate_daily_stats():
     """
-    Background task to calculate daily statistics
+    Background task to rebuild yesterday's daily statistics from scratch.
+    Ingestion keeps daily_stats up to date incrementally; this is only needed
+    to repair stats after readings were removed or edited outside the API.
     """
     try:
-        db = SessionLocal()
+        db = WorkerSessionLocal()
         
         try:
-            # Get yesterday's date
-            yesterday = datetime.now().date() - timedelta(days=1)
+            # Get yesterday's date (UTC days, matching the incremental upsert)
+            yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+            
+            # Half-open range so the timestamp indexes can be used
+            start_of_yesterday = datetime.combine(yesterday, time.min, tzinfo=timezone.utc)
+            start_of_today = start_of_yesterday + timedelta(days=1)
             
             # Calculate daily stats for each field and sensor type
             stats_query = db.query(
@@ -86,7 +305,8 @@ def calculate_daily_stats():
                 func.max(SensorReading.reading_value).label('max_value'),
                 func.count(SensorReading.id).label('count_readings')
             ).filter(
-                func.date(SensorReading.timestamp) == yesterday
+                SensorReading.timestamp >= start_of_yesterday,
+                SensorReading.timestamp < start_of_today
             ).group_by(
                 SensorReading.field_id,
                 SensorReading.sensor_type
@@ -94,13 +314,14 @@ def calculate_daily_stats():
             
             # Delete existing stats for yesterday
             db.query(DailyStats).filter(
-                func.date(DailyStats.date) == yesterday
+                DailyStats.date >= start_of_yesterday,
+                DailyStats.date < start_of_today
             ).delete()
             
             # Insert new stats
             for stat in stats_query.all():
                 daily_stat = DailyStats(
-                    date=yesterday,
+                    date=start_of_yesterday,
                     field_id=stat.field_id,
                     sensor_type=stat.sensor_type,
                     avg_value=float(stat.avg_value),
@@ -133,7 +354,7 @@ def cleanup_old_data():
     Background task to cleanup old sensor data (keep last 90 days)
     """
     try:
-        db = SessionLocal()
+        db = WorkerSessionLocal()
         
         try:
             # Calculate cutoff date (90 days ago)
@@ -146,6 +367,10 @@ def cleanup_old_data():
             
             db.commit()
             
+            if deleted_count:
+                from .services import CacheService
+                CacheService.readings_changed()
+            
             return {
                 'status': 'SUCCESS',
                 'deleted_count': deleted_count,
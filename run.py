@@ -4,16 +4,14 @@ Startup script for Field Insights Dashboard Backend
 """
 
 import uvicorn
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from app.config import settings
 
 if __name__ == "__main__":
     uvicorn.run(
         "app.main:app",
-        host=os.getenv("API_HOST", "0.0.0.0"),
-        port=int(os.getenv("API_PORT", 8000)),
-        reload=os.getenv("DEBUG", "True").lower() == "true",
+        host=settings.api_host,
+        port=settings.api_port,
+        reload=settings.debug,
         log_level="info"
     ) 
\ No newline at end of file